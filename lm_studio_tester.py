@@ -1,43 +1,457 @@
-import requests
+import httpx
+import asyncio
 import time
-import json
-import statistics
+import math
+import hashlib
+import http.client
+import urllib.parse
 import threading
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import orjson
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Deque, Callable, Tuple
+from dataclasses import dataclass, replace
 from datetime import datetime
 import psutil
 import numpy as np
+from cachetools import TTLCache
+
+
+# 同步与异步客户端共用的连接池上限
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+
+# 样本数超过该值时报告统计才使用numba内核，小样本下NumPy更快且无需导入和编译开销
+NUMBA_STATS_THRESHOLD = 100_000
 
 
 @dataclass
-class PerformanceMetrics:
-    """性能指标数据类"""
+class RequestMetrics:
+    """单次请求的性能指标数据类"""
     response_time: float  # 响应时间（秒）
     tokens_per_second: float  # 每秒生成的token数
     total_tokens: int  # 总token数
     prompt_tokens: int  # 提示词token数
     completion_tokens: int  # 完成token数
-    memory_usage: float  # 内存使用量（MB）
-    cpu_usage: float  # CPU使用率（%）
     timestamp: str  # 时间戳
+    ttft: Optional[float] = None  # 首token延迟（秒），仅流式请求
+    itl_p50: Optional[float] = None  # token间延迟中位数（秒），仅流式请求
+    itl_p99: Optional[float] = None  # token间延迟P99（秒），仅流式请求
+    decode_tps: Optional[float] = None  # 解码阶段每秒token数，仅流式请求
+    cache: Optional[str] = None  # 缓存命中类型："exact" 或 "semantic"，实际请求为None
+    t_end: float = 0.0  # 请求完成时刻（perf_counter），用于与系统采样按时间对齐
+
+
+# 兼容旧名称
+PerformanceMetrics = RequestMetrics
+
+
+@dataclass
+class SystemSample:
+    """系统资源采样数据类，由后台线程按固定间隔采集"""
+    t: float  # 采样时刻（perf_counter）
+    mem_mb: float  # 内存使用量（MB）
+    cpu_pct: float  # CPU使用率（%）
+
+
+# 生成报告时使用的结构化数组布局
+_METRICS_DTYPE = np.dtype([
+    ('rt', 'f8'), ('tps', 'f8'), ('ct', 'i8'), ('tt', 'i8'),
+    ('ttft', 'f8'), ('itl50', 'f8'), ('itl99', 'f8'), ('dtps', 'f8')
+])
+
+
+def _stat_kernel_numpy(x: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    计算均值、样本标准差、最小值、最大值（NumPy实现）
+    
+    Args:
+        x: 一维float64数组，至少包含一个元素
+        
+    Returns:
+        Tuple[float, float, float, float]: (mean, std, min, max)
+    """
+    std = float(x.std(ddof=1)) if x.size > 1 else 0.0
+    return float(x.mean()), std, float(x.min()), float(x.max())
+
+
+def _stat_kernel_loop(x):
+    """
+    单次遍历同时计算均值、样本标准差、最小值、最大值
+    
+    使用Welford递推保证数值稳定，不分配中间数组；编译结果缓存到磁盘，只在首次运行时付出编译开销。
+    """
+    n = x.size
+    mean = 0.0
+    m2 = 0.0
+    mn = x[0]
+    mx = x[0]
+    for i in range(n):
+        v = x[i]
+        delta = v - mean
+        mean += delta / (i + 1)
+        m2 += delta * (v - mean)
+        if v < mn:
+            mn = v
+        if v > mx:
+            mx = v
+    std = (m2 / (n - 1)) ** 0.5 if n > 1 else 0.0
+    return mean, std, mn, mx
+
+
+_numba_stat_kernel = None
+
+
+def _get_numba_stat_kernel() -> Optional[Callable]:
+    """
+    首次使用时导入numba并编译统计内核
+    
+    Returns:
+        Callable: 编译后的内核，numba未安装时返回None
+    """
+    global _numba_stat_kernel
+    if _numba_stat_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:  # numba为可选依赖，未安装时报告统计使用NumPy实现
+            _numba_stat_kernel = False
+        else:
+            _numba_stat_kernel = njit(cache=True)(_stat_kernel_loop)
+    return _numba_stat_kernel or None
+
+
+def _stat_kernel(x: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    计算均值、样本标准差、最小值、最大值，大样本时使用numba内核
+    
+    Args:
+        x: 一维float64数组，至少包含一个元素
+        
+    Returns:
+        Tuple[float, float, float, float]: (mean, std, min, max)
+    """
+    if x.size > NUMBA_STATS_THRESHOLD:
+        kernel = _get_numba_stat_kernel()
+        if kernel is not None:
+            return kernel(x)
+    return _stat_kernel_numpy(x)
+
+
+def _percentiles(x: np.ndarray, qs: List[float]) -> np.ndarray:
+    """
+    基于np.partition的O(N)分位数计算，一次划分得到所有分位点
+    
+    插值方式与np.percentile默认的线性插值一致。
+    
+    Args:
+        x: 一维数组，至少包含一个元素
+        qs: 百分位列表，取值0-100
+        
+    Returns:
+        np.ndarray: 对应的分位数
+    """
+    pos = np.asarray(qs, dtype=np.float64) / 100 * (x.size - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, x.size - 1)
+    part = np.partition(x, np.unique(np.concatenate((lo, hi))))
+    return part[lo] + (part[hi] - part[lo]) * (pos - lo)
+
+
+class P2Quantile:
+    """
+    P²算法的单个分位数流式估计器
+    
+    只维护5个标记点，每次更新O(1)，内存固定，不保存原始样本。
+    """
+    
+    def __init__(self, p: float):
+        """
+        Args:
+            p: 目标分位数，取值范围(0, 1)
+        """
+        self.p = p
+        self._initial: List[float] = []
+        self._q: Optional[List[float]] = None  # 标记点高度
+        self._n: Optional[List[int]] = None  # 标记点实际位置
+        self._desired: Optional[List[float]] = None  # 标记点期望位置
+        self._increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+    
+    def update(self, x: float):
+        """加入一个观测值"""
+        if self._q is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self._q = sorted(self._initial)
+                self._n = [0, 1, 2, 3, 4]
+                self._desired = [0.0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4.0]
+            return
+        
+        q, n = self._q, self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        
+        # 调整中间三个标记点，使其逼近期望位置
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+    
+    def _parabolic(self, i: int, d: int) -> float:
+        """P²的分段抛物线插值"""
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+    
+    def value(self) -> float:
+        """
+        Returns:
+            float: 当前的分位数估计值，没有数据时返回nan
+        """
+        if self._q is not None:
+            return self._q[2]
+        if not self._initial:
+            return float('nan')
+        # 样本不足5个时直接计算精确值
+        return float(np.percentile(self._initial, self.p * 100))
+
+
+class StreamingStats:
+    """
+    流式统计量：Welford算法维护均值和方差，P²算法估计分位数
+    
+    每次更新O(1)，适合在长时间测试过程中随时读取统计结果。
+    """
+    
+    def __init__(self, quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)):
+        """
+        Args:
+            quantiles: 需要跟踪的分位数
+        """
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self._quantiles = {q: P2Quantile(q) for q in quantiles}
+    
+    def update(self, x: float):
+        """加入一个观测值"""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        for estimator in self._quantiles.values():
+            estimator.update(x)
+    
+    @property
+    def std(self) -> float:
+        """样本标准差"""
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+    
+    def quantile(self, q: float) -> float:
+        """
+        Args:
+            q: 构造时指定的分位数之一
+            
+        Returns:
+            float: 分位数估计值
+        """
+        return self._quantiles[q].value()
+
+
+class SemanticCache:
+    """
+    语义缓存：对提示词做向量化，余弦相似度超过阈值时复用已缓存的结果
+    
+    向量已归一化，检索即为对全部缓存向量做一次内积（与faiss的IndexFlatIP等价），
+    对于千条量级的缓存无需额外的向量检索依赖。
+    """
+    
+    def __init__(self, embed: Callable[[str], Optional[np.ndarray]], threshold: float = 0.93,
+                 maxsize: int = 1024):
+        """
+        初始化语义缓存
+        
+        Args:
+            embed: 将文本转换为向量的函数，失败时返回None
+            threshold: 判定为命中的最小余弦相似度
+            maxsize: 每组请求参数下的最大缓存条目数，超出后淘汰最早的条目
+        """
+        self._embed = embed
+        self.threshold = threshold
+        self.maxsize = maxsize
+        # 按请求参数分组，每组保存(向量矩阵, 结果列表)
+        self._indexes: Dict[tuple, Tuple[np.ndarray, List[RequestMetrics]]] = {}
+        self._lock = threading.Lock()
+    
+    def lookup(self, prompt: str, params: tuple) -> Tuple[Optional[np.ndarray], Optional[RequestMetrics]]:
+        """
+        查找语义相近的已缓存结果
+        
+        Args:
+            prompt: 输入提示词
+            params: 除提示词外必须完全一致的请求参数
+            
+        Returns:
+            tuple: (提示词向量, 命中的结果)，未命中时结果为None，向量化失败时两者均为None
+        """
+        vector = self._embed(prompt)
+        if vector is None:
+            return None, None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        
+        with self._lock:
+            index = self._indexes.get(params)
+            if index is None:
+                return vector, None
+            vectors, entries = index
+            scores = vectors @ vector
+            best = int(np.argmax(scores))
+            if scores[best] > self.threshold:
+                return vector, entries[best]
+        return vector, None
+    
+    def add(self, vector: np.ndarray, params: tuple, metrics: RequestMetrics):
+        """
+        将一次实际请求的结果加入缓存
+        
+        Args:
+            vector: lookup返回的提示词向量
+            params: 请求参数
+            metrics: 性能指标
+        """
+        with self._lock:
+            index = self._indexes.get(params)
+            if index is None:
+                self._indexes[params] = (vector[np.newaxis, :], [metrics])
+                return
+            vectors, entries = index
+            vectors = np.vstack([vectors, vector])
+            entries = entries + [metrics]
+            if len(entries) > self.maxsize:
+                vectors = vectors[1:]
+                entries = entries[1:]
+            self._indexes[params] = (vectors, entries)
 
 
 class LMStudioPerformanceTester:
     """LM Studio性能测试器"""
     
-    def __init__(self, base_url: str = "http://localhost:1234", model_name: str = None):
+    def __init__(self, base_url: str = "http://localhost:1234", model_name: str = None,
+                 use_cache: bool = False, cache_size: int = 1024, cache_ttl: int = 3600,
+                 sample_interval: float = 0.5, semantic_cache: bool = False,
+                 semantic_threshold: float = 0.93, embedding_model: Optional[str] = None,
+                 context_window: Optional[int] = None, tokenizer_encoding: str = "cl100k_base"):
         """
         初始化性能测试器
         
         Args:
             base_url: LM Studio服务器地址
             model_name: 模型名称
+            use_cache: 是否默认启用响应缓存（纯性能测试应保持关闭）
+            cache_size: 缓存最大条目数
+            cache_ttl: 缓存有效期（秒）
+            sample_interval: 后台系统资源采样间隔（秒）
+            semantic_cache: 是否启用语义缓存，复用语义相近提示词的结果
+            semantic_threshold: 语义缓存命中的最小余弦相似度
+            embedding_model: 使用LM Studio /v1/embeddings 时的嵌入模型名称；
+                为None时使用本地 sentence-transformers 的 all-MiniLM-L6-v2
+            context_window: 模型上下文长度，设置后会按提示词长度收紧max_tokens
+            tokenizer_encoding: 客户端分词使用的tiktoken编码，用于服务端未返回usage时估算token数
         """
         self.base_url = base_url.rstrip('/')
         self.model_name = model_name
-        self.session = requests.Session()
-        self.metrics_history: List[PerformanceMetrics] = []
+        
+        # 热路径上不变的部分只计算一次，每次请求仅复制模板并填入变化的字段
+        self._model_id = self.model_name or "local-model"
+        self._chat_url = f"{self.base_url}/v1/chat/completions"
+        self._payload_template = {
+            "model": self._model_id,
+            "messages": [{"role": "user", "content": ""}],
+            "max_tokens": 100,
+            "temperature": 0.7,
+            "stream": False
+        }
+        # 连接池复用keep-alive连接；服务端支持HTTP/2时多个请求复用同一条TCP连接
+        self.client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=True, retries=2, limits=_HTTP_LIMITS),
+            headers={"Content-Type": "application/json"},
+            timeout=60.0
+        )
+        # deque追加为O(1)且不会因扩容而整体复制；锁只保护追加操作本身
+        self.metrics_history: Deque[RequestMetrics] = deque()
+        self._metrics_lock = threading.Lock()
+        # 增量维护的统计量，测试进行中随时读取而无需遍历metrics_history
+        self._live_rt = StreamingStats()
+        self._live_tps = StreamingStats()
+        
+        # 以(提示词, 模型, max_tokens, 温度)为键的LRU+TTL响应缓存
+        self.use_cache = use_cache
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._cache_lock = threading.Lock()  # 并行批量测试时缓存会被多个线程访问
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # 预热请求的耗时单独记录，不计入稳态统计
+        self.warmup_times: List[float] = []
+        self._warmed_up = False
+        
+        # 客户端分词器（tiktoken），首次需要时才加载
+        self.context_window = context_window
+        self.tokenizer_encoding = tokenizer_encoding
+        self._encoder = None
+        self._encoder_loaded = False
+        
+        # 语义缓存为可选功能，嵌入模型在首次使用时才加载
+        self.embedding_model = embedding_model
+        self._embedder = None
+        self._semantic_cache: Optional[SemanticCache] = None
+        self.semantic_hits = 0
+        if semantic_cache:
+            if embedding_model is None:
+                try:
+                    import sentence_transformers  # noqa: F401
+                except ImportError:
+                    raise ImportError("语义缓存需要安装 sentence-transformers，"
+                                      "或通过 embedding_model 参数使用LM Studio的 /v1/embeddings")
+            self._semantic_cache = SemanticCache(self._embed, semantic_threshold, cache_size)
+        
+        # 批量并行测试复用的线程池，首次使用时创建
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_workers = 0
+        
+        # 系统资源由后台线程按固定间隔采样成独立的时间序列，请求路径上不做任何探测，
+        # 需要时再按时间戳与请求指标对齐（0.5秒间隔下约可保留12小时）
+        self.sample_interval = sample_interval
+        self._system_samples: Deque[SystemSample] = deque(maxlen=86400)
+        psutil.cpu_percent(interval=None)  # 首次调用仅用于建立CPU统计基准
+        self._system_samples.append(self._take_system_sample())
+        self._sampler_stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_system_metrics, daemon=True)
+        self._sampler.start()
         
     def check_server_status(self) -> bool:
         """
@@ -47,16 +461,16 @@ class LMStudioPerformanceTester:
             bool: 服务器是否可用
         """
         try:
-            response = self.session.get(f"{self.base_url}/v1/models", timeout=5)
+            response = self.client.get(f"{self.base_url}/v1/models", timeout=5)
             if response.status_code == 200:
-                models = response.json()
+                models = orjson.loads(response.content)
                 print(f"✅ LM Studio服务器连接成功")
                 print(f"📋 可用模型: {[model['id'] for model in models.get('data', [])]}")
                 return True
             else:
                 print(f"❌ 服务器响应错误: {response.status_code}")
                 return False
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             print(f"❌ 无法连接到LM Studio服务器: {e}")
             return False
     
@@ -68,30 +482,232 @@ class LMStudioPerformanceTester:
             List[str]: 模型名称列表
         """
         try:
-            response = self.session.get(f"{self.base_url}/v1/models", timeout=5)
+            response = self.client.get(f"{self.base_url}/v1/models", timeout=5)
             if response.status_code == 200:
-                models = response.json()
+                models = orjson.loads(response.content)
                 return [model['id'] for model in models.get('data', [])]
             else:
                 print(f"❌ 服务器响应错误: {response.status_code}")
                 return []
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             print(f"❌ 无法连接到LM Studio服务器: {e}")
             return []
     
-    def get_system_metrics(self) -> tuple:
+    @staticmethod
+    def _take_system_sample() -> SystemSample:
         """
-        获取系统资源使用情况
+        采集一次系统资源使用情况（非阻塞）
         
         Returns:
-            tuple: (内存使用量MB, CPU使用率%)
+            SystemSample: 系统资源采样
         """
         memory_info = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory_mb = memory_info.used / 1024 / 1024
-        return memory_mb, cpu_percent
+        return SystemSample(t=time.perf_counter(), mem_mb=memory_mb, cpu_pct=cpu_percent)
+    
+    def _sample_system_metrics(self):
+        """后台采样线程：按固定间隔将系统资源写入环形缓冲区"""
+        while not self._sampler_stop.wait(self.sample_interval):
+            self._system_samples.append(self._take_system_sample())
+    
+    def get_system_metrics(self) -> tuple:
+        """
+        获取系统资源使用情况（后台采样线程的最近一次结果）
+        
+        Returns:
+            tuple: (内存使用量MB, CPU使用率%)
+        """
+        sample = self._system_samples[-1]
+        return sample.mem_mb, sample.cpu_pct
+    
+    def _system_sample_arrays(self) -> tuple:
+        """
+        将系统采样时间序列转换为列式数组
+        
+        Returns:
+            tuple: (采样时刻, 内存使用量MB, CPU使用率%) 三个NumPy数组
+        """
+        samples = list(self._system_samples)
+        t = np.fromiter((s.t for s in samples), dtype=np.float64, count=len(samples))
+        mem = np.fromiter((s.mem_mb for s in samples), dtype=np.float64, count=len(samples))
+        cpu = np.fromiter((s.cpu_pct for s in samples), dtype=np.float64, count=len(samples))
+        return t, mem, cpu
+    
+    def system_metrics_for(self, metrics: List[RequestMetrics]) -> tuple:
+        """
+        按完成时刻为每个请求匹配最近的一次系统采样
+        
+        Args:
+            metrics: 请求指标列表
+            
+        Returns:
+            tuple: (内存使用量MB数组, CPU使用率%数组)，与输入顺序一致
+        """
+        t, mem, cpu = self._system_sample_arrays()
+        t_end = np.fromiter((m.t_end for m in metrics), dtype=np.float64, count=len(metrics))
+        # searchsorted给出右侧邻居，再与左侧邻居比较取更近的一个
+        right = np.clip(np.searchsorted(t, t_end), 1, len(t) - 1) if len(t) > 1 else np.zeros(len(t_end), dtype=int)
+        left = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(t[left] - t_end) <= np.abs(t[right] - t_end), left, right)
+        return mem[nearest], cpu[nearest]
+    
+    def close(self):
+        """停止后台采样线程、关闭线程池和HTTP会话"""
+        self._sampler_stop.set()
+        self._sampler.join(timeout=self.sample_interval)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.client.close()
+    
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float, stream: bool) -> str:
+        """
+        计算响应缓存的键
+        
+        Returns:
+            str: 请求参数的SHA-256摘要
+        """
+        key = orjson.dumps(
+            {"p": prompt, "m": self.model_name, "t": max_tokens, "T": temperature, "s": stream},
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.sha256(key).hexdigest()
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        计算文本的嵌入向量
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            np.ndarray: 嵌入向量，请求失败时返回None
+        """
+        if self.embedding_model:
+            try:
+                response = self.client.post(
+                    f"{self.base_url}/v1/embeddings",
+                    content=orjson.dumps({"model": self.embedding_model, "input": text}),
+                    timeout=30
+                )
+                if response.status_code != 200:
+                    print(f"⚠️  嵌入请求失败: {response.status_code}")
+                    return None
+                return np.asarray(orjson.loads(response.content)['data'][0]['embedding'], dtype=np.float32)
+            except (httpx.HTTPError, orjson.JSONDecodeError, KeyError, IndexError) as e:
+                print(f"⚠️  嵌入请求异常: {e}")
+                return None
+        
+        if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        return self._embedder.encode(text)
+    
+    def _get_encoder(self):
+        """
+        延迟加载tiktoken编码器
+        
+        Returns:
+            tiktoken.Encoding: 编码器，未安装或加载失败时返回None
+        """
+        if not self._encoder_loaded:
+            self._encoder_loaded = True
+            try:
+                import tiktoken
+                self._encoder = tiktoken.get_encoding(self.tokenizer_encoding)
+            except (ImportError, OSError, ValueError) as e:
+                print(f"⚠️  无法加载分词器，未返回usage时流式请求按数据块数近似token数，非流式请求记为0，context_window不生效: {e}")
+        return self._encoder
+    
+    def count_tokens(self, text: str) -> Optional[int]:
+        """
+        在客户端统计文本的token数
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            int: token数，分词器不可用时返回None
+        """
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        return len(encoder.encode(text, disallowed_special=()))
+    
+    def _estimate_usage(self, prompt: str, completion: str, num_chunks: int = 0) -> Dict[str, int]:
+        """
+        服务端未返回usage时，在客户端估算token数
+        
+        Args:
+            prompt: 输入提示词
+            completion: 生成的文本
+            num_chunks: 流式请求的内容数据块数，分词器不可用时作为生成token数的近似值
+            
+        Returns:
+            Dict[str, int]: 与API格式一致的usage字典
+        """
+        completion_tokens = self.count_tokens(completion)
+        if completion_tokens is None:
+            completion_tokens = num_chunks
+        prompt_tokens = self.count_tokens(prompt) or 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    
+    def _clamp_max_tokens(self, prompt: str, max_tokens: int) -> int:
+        """
+        设置了context_window时，按提示词长度收紧max_tokens
+        
+        Args:
+            prompt: 输入提示词
+            max_tokens: 请求的最大生成token数
+            
+        Returns:
+            int: 提示词加生成长度不超过上下文窗口的max_tokens
+        """
+        if self.context_window:
+            prompt_tokens = self.count_tokens(prompt)
+            if prompt_tokens is not None:
+                max_tokens = max(1, min(max_tokens, self.context_window - prompt_tokens))
+        return max_tokens
+    
+    def _response_usage(self, prompt: str, data: Dict[str, Any]) -> Dict[str, int]:
+        """
+        从非流式chat completions响应中取出usage，缺失时在客户端估算
+        
+        Args:
+            prompt: 输入提示词
+            data: 解析后的响应体
+            
+        Returns:
+            Dict[str, int]: usage字典
+        """
+        usage = data.get('usage')
+        if not usage:
+            choices = data.get('choices') or [{}]
+            usage = self._estimate_usage(prompt, (choices[0].get('message') or {}).get('content') or "")
+        return usage
+    
+    def _build_payload(self, prompt: str, max_tokens: int, temperature: float,
+                       stream: bool = False) -> Dict[str, Any]:
+        """
+        基于预先构建的模板生成chat completions请求体
+        
+        Returns:
+            Dict[str, Any]: 请求体
+        """
+        payload = self._payload_template.copy()
+        payload["messages"] = [{"role": "user", "content": prompt}]
+        payload["max_tokens"] = max_tokens
+        payload["temperature"] = temperature
+        payload["stream"] = stream
+        return payload
     
-    def single_inference_test(self, prompt: str, max_tokens: int = 100, temperature: float = 0.7) -> Optional[PerformanceMetrics]:
+    def single_inference_test(self, prompt: str, max_tokens: int = 100, temperature: float = 0.7,
+                              stream: bool = False, use_cache: Optional[bool] = None) -> Optional[RequestMetrics]:
         """
         执行单次推理测试
         
@@ -99,79 +715,437 @@ class LMStudioPerformanceTester:
             prompt: 输入提示词
             max_tokens: 最大生成token数
             temperature: 温度参数
+            stream: 是否使用流式输出，开启后额外统计首token延迟和token间延迟
+            use_cache: 是否使用响应缓存，None表示沿用测试器的默认设置
             
         Returns:
-            PerformanceMetrics: 性能指标，如果失败返回None
+            RequestMetrics: 性能指标，如果失败返回None。缓存命中时返回cache字段标记了
+            命中类型的副本，且不计入metrics_history
         """
-        start_time = time.time()
-        memory_before, cpu_before = self.get_system_metrics()
+        if use_cache is None:
+            use_cache = self.use_cache
+        if not use_cache and self._semantic_cache is None:
+            return self._run_inference(prompt, max_tokens, temperature, stream)
         
-        payload = {
-            "model": self.model_name or "local-model",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "stream": False
-        }
+        key = None
+        if use_cache:
+            key = self._cache_key(prompt, max_tokens, temperature, stream)
+            with self._cache_lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self.cache_hits += 1
+            if cached is not None:
+                return replace(cached, cache="exact", timestamp=datetime.now().isoformat())
+        
+        vector = None
+        params = (self._model_id, max_tokens, temperature, stream)
+        if self._semantic_cache is not None:
+            vector, cached = self._semantic_cache.lookup(prompt, params)
+            if cached is not None:
+                with self._cache_lock:
+                    self.semantic_hits += 1
+                return replace(cached, cache="semantic", timestamp=datetime.now().isoformat())
         
+        with self._cache_lock:
+            self.cache_misses += 1
+        metrics = self._run_inference(prompt, max_tokens, temperature, stream)
+        if metrics:
+            if key is not None:
+                with self._cache_lock:
+                    self._cache[key] = metrics
+            if vector is not None:
+                self._semantic_cache.add(vector, params, metrics)
+        return metrics
+    
+    def _run_inference(self, prompt: str, max_tokens: int, temperature: float,
+                       stream: bool) -> Optional[RequestMetrics]:
+        """
+        实际发送一次推理请求并记录性能指标（不经过缓存）
+        
+        Returns:
+            RequestMetrics: 性能指标，如果失败返回None
+        """
+        result = self._raw_inference(prompt, max_tokens, temperature, stream)
+        if result is None:
+            return None
+        response_time, usage, stream_stats = result
+        return self._record_metrics(response_time, usage, **stream_stats)
+    
+    def _raw_inference(self, prompt: str, max_tokens: int, temperature: float = 0.7,
+                       stream: bool = False) -> Optional[tuple]:
+        """
+        发送一次推理请求并解析结果，不写入metrics_history
+        
+        Args:
+            prompt: 输入提示词
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            stream: 是否使用流式输出
+            
+        Returns:
+            tuple: (响应时间, usage字典, 流式指标字典)，如果失败返回None
+        """
+        payload = self._build_payload(prompt, self._clamp_max_tokens(prompt, max_tokens), temperature, stream)
+        if stream:
+            # 要求服务端在最后一个数据块中返回usage
+            payload["stream_options"] = {"include_usage": True}
+        
+        start_time = time.perf_counter()
         try:
-            response = self.session.post(
-                f"{self.base_url}/v1/chat/completions",
-                json=payload,
-                timeout=60
-            )
+            if stream:
+                with self.client.stream("POST", self._chat_url, content=orjson.dumps(payload)) as response:
+                    if response.status_code != 200:
+                        response.read()
+                        print(f"❌ API请求失败: {response.status_code} - {response.text}")
+                        return None
+                    usage, token_times, completion = self._consume_stream(response)
+                end_time = time.perf_counter()
+                if not usage:
+                    usage = self._estimate_usage(prompt, completion, len(token_times))
+                return end_time - start_time, usage, self._stream_stats(start_time, token_times)
             
-            end_time = time.time()
-            memory_after, cpu_after = self.get_system_metrics()
+            response = self.client.post(self._chat_url, content=orjson.dumps(payload))
+            end_time = time.perf_counter()
             
-            if response.status_code == 200:
-                data = response.json()
-                response_time = end_time - start_time
-                
-                # 提取token信息
-                usage = data.get('usage', {})
-                total_tokens = usage.get('total_tokens', 0)
-                prompt_tokens = usage.get('prompt_tokens', 0)
-                completion_tokens = usage.get('completion_tokens', 0)
-                
-                # 计算tokens per second
-                tokens_per_second = completion_tokens / response_time if response_time > 0 else 0
-                
-                metrics = PerformanceMetrics(
-                    response_time=response_time,
-                    tokens_per_second=tokens_per_second,
-                    total_tokens=total_tokens,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    memory_usage=memory_after,
-                    cpu_usage=cpu_after,
-                    timestamp=datetime.now().isoformat()
-                )
-                
-                self.metrics_history.append(metrics)
-                return metrics
-            else:
+            if response.status_code != 200:
                 print(f"❌ API请求失败: {response.status_code} - {response.text}")
                 return None
+            
+            data = orjson.loads(response.content)
+            return end_time - start_time, self._response_usage(prompt, data), {}
                 
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            print(f"❌ 请求异常: {e}")
+            return None
+    
+    def make_fixed_runner(self, prompt: str, max_tokens: int = 50,
+                          temperature: float = 0.7) -> Callable[[], Optional[RequestMetrics]]:
+        """
+        为固定的请求参数生成专用的请求函数
+        
+        请求体、目标路径和请求头只在这里计算一次；返回的函数直接通过
+        http.client在一条keep-alive连接上发送预编码的字节，跳过HTTP客户端每次
+        调用的URL合并和请求对象构建，适合压力测试这类重复发送相同请求的场景。
+        
+        Args:
+            prompt: 输入提示词
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            
+        Returns:
+            Callable: 无参数的请求函数，返回RequestMetrics或None；其close属性用于关闭连接
+        """
+        max_tokens = self._clamp_max_tokens(prompt, max_tokens)
+        url = urllib.parse.urlsplit(self._chat_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        body = orjson.dumps(self._build_payload(prompt, max_tokens, temperature))
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive"
+        }
+        conn = None
+        
+        def close():
+            nonlocal conn
+            if conn is not None:
+                conn.close()
+                conn = None
+        
+        def run() -> Optional[RequestMetrics]:
+            nonlocal conn
+            # 复用的连接可能已被服务端关闭，失败时重连重试一次
+            for attempt in range(2):
+                if conn is None:
+                    conn = connection_class(url.hostname, url.port, timeout=60)
+                start_time = time.perf_counter()
+                try:
+                    conn.request("POST", url.path, body, headers)
+                    response = conn.getresponse()
+                    content = response.read()
+                    break
+                except (http.client.HTTPException, OSError) as e:
+                    close()
+                    if attempt:
+                        print(f"❌ 请求异常: {e}")
+                        return None
+            end_time = time.perf_counter()
+            if response.will_close:
+                close()
+            
+            if response.status != 200:
+                print(f"❌ API请求失败: {response.status} - {content.decode('utf-8', errors='replace')}")
+                return None
+            try:
+                data = orjson.loads(content)
+            except orjson.JSONDecodeError as e:
+                print(f"❌ 请求异常: {e}")
+                return None
+            return self._record_metrics(end_time - start_time, self._response_usage(prompt, data))
+        
+        run.close = close
+        return run
+    
+    def warmup(self, n: int = 2, prompt: str = "ok") -> List[float]:
+        """
+        预热：发送少量极短请求，让服务端完成模型加载、KV缓存分配等一次性开销
+        
+        预热请求不计入metrics_history，其耗时单独记录在warmup_times中。
+        
+        Args:
+            n: 预热请求次数
+            prompt: 预热使用的提示词
+            
+        Returns:
+            List[float]: 每次预热请求的响应时间（秒）
+        """
+        print(f"🔥 预热中，发送 {n} 个预热请求...")
+        times = []
+        for _ in range(n):
+            result = self._raw_inference(prompt, max_tokens=1)
+            if result is not None:
+                times.append(result[0])
+        self.warmup_times.extend(times)
+        self._warmed_up = True
+        if times:
+            print(f"🔥 预热完成 - 首次: {times[0]:.3f}s, 最后一次: {times[-1]:.3f}s")
+        return times
+    
+    def _ensure_warmup(self, skip_warmup: bool):
+        """测试开始前自动预热一次（同一测试器只预热一次）"""
+        if not skip_warmup and not self._warmed_up:
+            self.warmup()
+    
+    def _consume_stream(self, response: httpx.Response) -> tuple:
+        """
+        逐行读取SSE流，记录每个内容数据块的到达时间
+        
+        Args:
+            response: 通过client.stream发起的响应对象
+            
+        Returns:
+            tuple: (usage字典, 内容数据块到达时间列表, 生成的完整文本)
+        """
+        usage = {}
+        token_times = []
+        contents = []
+        # iter_lines在数据到达时即产出完整的行，时间戳不受缓冲影响
+        for line in response.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = line[5:].strip()
+            if chunk == "[DONE]":
+                break
+            data = orjson.loads(chunk)
+            if data.get('usage'):
+                usage = data['usage']
+            for choice in data.get('choices', []):
+                content = choice.get('delta', {}).get('content')
+                if content:
+                    token_times.append(time.perf_counter())
+                    contents.append(content)
+                    break
+        return usage, token_times, "".join(contents)
+    
+    @staticmethod
+    def _stream_stats(start_time: float, token_times: List[float]) -> Dict[str, Optional[float]]:
+        """
+        根据内容数据块到达时间计算流式指标
+        
+        Args:
+            start_time: 请求发出时间（perf_counter）
+            token_times: 内容数据块到达时间列表（perf_counter）
+            
+        Returns:
+            Dict[str, Optional[float]]: ttft、itl_p50、itl_p99、decode_tps
+        """
+        if not token_times:
+            return {}
+        
+        stats = {"ttft": token_times[0] - start_time}
+        if len(token_times) > 1:
+            itl = np.diff(token_times)
+            stats["itl_p50"], stats["itl_p99"] = (float(v) for v in np.percentile(itl, [50, 99]))
+            decode_time = token_times[-1] - token_times[0]
+            stats["decode_tps"] = (len(token_times) - 1) / decode_time if decode_time > 0 else 0
+        return stats
+    
+    def _record_metrics(self, response_time: float, usage: Dict[str, Any], **stream_stats: float) -> RequestMetrics:
+        """
+        根据一次成功请求的耗时和usage信息生成性能指标并记录
+        
+        Args:
+            response_time: 响应时间（秒）
+            usage: API返回的usage字段
+            **stream_stats: 流式请求的附加指标（ttft、itl_p50、itl_p99、decode_tps）
+            
+        Returns:
+            RequestMetrics: 性能指标
+        """
+        # 提取token信息
+        total_tokens = usage.get('total_tokens', 0)
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        
+        # 计算tokens per second
+        tokens_per_second = completion_tokens / response_time if response_time > 0 else 0
+        
+        metrics = RequestMetrics(
+            response_time=response_time,
+            tokens_per_second=tokens_per_second,
+            total_tokens=total_tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            timestamp=datetime.now().isoformat(),
+            t_end=time.perf_counter(),
+            **stream_stats
+        )
+        
+        with self._metrics_lock:
+            self.metrics_history.append(metrics)
+            self._live_rt.update(response_time)
+            self._live_tps.update(tokens_per_second)
+        return metrics
+    
+    def reset_live_stats(self):
+        """清空实时统计，使后续的live_stats只反映新一轮测试"""
+        with self._metrics_lock:
+            self._live_rt = StreamingStats()
+            self._live_tps = StreamingStats()
+    
+    def live_stats(self) -> Dict[str, float]:
+        """
+        读取增量维护的实时统计（O(1)，适合测试过程中频繁输出进度）
+        
+        分位数为P²算法的估计值；测试结束后的精确统计请使用generate_performance_report。
+        
+        Returns:
+            Dict[str, float]: 请求数、响应时间均值/标准差/P50/P95/P99、平均TPS
+        """
+        with self._metrics_lock:
+            rt, tps = self._live_rt, self._live_tps
+            return {
+                "count": rt.count,
+                "rt_mean": rt.mean,
+                "rt_std": rt.std,
+                "rt_p50": rt.quantile(0.5),
+                "rt_p95": rt.quantile(0.95),
+                "rt_p99": rt.quantile(0.99),
+                "tps_mean": tps.mean
+            }
+    
+    async def _async_single(self, client: httpx.AsyncClient, prompt: str, max_tokens: int = 100,
+                            temperature: float = 0.7) -> Optional[RequestMetrics]:
+        """
+        异步执行单次推理请求（供并发测试使用）
+        
+        Args:
+            client: 共享的异步HTTP客户端
+            prompt: 输入提示词
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            
+        Returns:
+            RequestMetrics: 性能指标，如果失败返回None
+        """
+        payload = self._build_payload(prompt, self._clamp_max_tokens(prompt, max_tokens), temperature)
+        
+        # 计时在协程内部进行，保证每个请求的指标独立准确
+        start_time = time.perf_counter()
+        try:
+            response = await client.post(self._chat_url, content=orjson.dumps(payload))
+            end_time = time.perf_counter()
+            if response.status_code != 200:
+                print(f"❌ API请求失败: {response.status_code} - {response.text}")
+                return None
+            data = orjson.loads(response.content)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             print(f"❌ 请求异常: {e}")
             return None
+        
+        return self._record_metrics(end_time - start_time, self._response_usage(prompt, data))
     
-    def batch_inference_test(self, prompts: List[str], max_tokens: int = 100) -> List[PerformanceMetrics]:
+    async def _run_concurrent(self, prompt: str, num_concurrent: int, max_tokens: int) -> List[RequestMetrics]:
+        """
+        在同一个事件循环中并发发送多个推理请求
+        
+        Args:
+            prompt: 测试提示词
+            num_concurrent: 并发数量
+            max_tokens: 最大生成token数
+            
+        Returns:
+            List[RequestMetrics]: 成功请求的性能指标列表
+        """
+        results = []
+        # LM Studio只支持HTTP/1.1，连接池需容纳全部并发请求，避免客户端排队被计入响应时间
+        pool_size = max(_HTTP_LIMITS.max_connections, num_concurrent)
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        transport = httpx.AsyncHTTPTransport(http2=True, retries=2, limits=limits)
+        async with httpx.AsyncClient(transport=transport, headers={"Content-Type": "application/json"},
+                                     timeout=60.0) as client:
+            tasks = [self._async_single(client, prompt, max_tokens) for _ in range(num_concurrent)]
+            # 按完成顺序逐个输出结果，而不是等待全部请求结束
+            for task in asyncio.as_completed(tasks):
+                metrics = await task
+                if metrics:
+                    results.append(metrics)
+                    print(f"✅ 完成 - 响应时间: {metrics.response_time:.2f}s, TPS: {metrics.tokens_per_second:.2f}")
+        return results
+    
+    def _get_executor(self, max_workers: int) -> ThreadPoolExecutor:
+        """
+        获取复用的线程池，容量不足时按需重建
+        
+        Args:
+            max_workers: 需要的最大工作线程数
+            
+        Returns:
+            ThreadPoolExecutor: 线程池
+        """
+        if self._executor is None or self._executor_workers < max_workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers)
+            self._executor_workers = max_workers
+        return self._executor
+    
+    def batch_inference_test(self, prompts: List[str], max_tokens: int = 100,
+                             inter_request_delay: float = 0.0, max_workers: int = 1,
+                             skip_warmup: bool = False) -> List[RequestMetrics]:
         """
         批量推理测试
         
         Args:
             prompts: 提示词列表
             max_tokens: 最大生成token数
+            inter_request_delay: 相邻请求之间的间隔（秒），默认不等待，仅顺序执行时有效
+            max_workers: 并行执行的线程数，大于1时通过复用的线程池并行发送请求
+            skip_warmup: 是否跳过测试前的预热
             
         Returns:
-            List[PerformanceMetrics]: 性能指标列表
+            List[RequestMetrics]: 性能指标列表，与输入提示词顺序一致
         """
+        self._ensure_warmup(skip_warmup)
         results = []
         print(f"🚀 开始批量测试，共 {len(prompts)} 个请求...")
         
+        if max_workers > 1:
+            executor = self._get_executor(max_workers)
+            futures = {executor.submit(self.single_inference_test, prompt, max_tokens): i
+                       for i, prompt in enumerate(prompts)}
+            completed = {}
+            for future in as_completed(futures):
+                i = futures[future]
+                metrics = future.result()
+                if metrics:
+                    completed[i] = metrics
+                    print(f"✅ 第 {i + 1} 个请求完成 - 响应时间: {metrics.response_time:.2f}s, "
+                          f"TPS: {metrics.tokens_per_second:.2f}")
+                else:
+                    print(f"❌ 第 {i + 1} 个请求失败")
+            return [completed[i] for i in sorted(completed)]
+        
         for i, prompt in enumerate(prompts, 1):
             print(f"📝 执行第 {i}/{len(prompts)} 个请求...")
             metrics = self.single_inference_test(prompt, max_tokens)
@@ -181,52 +1155,128 @@ class LMStudioPerformanceTester:
             else:
                 print(f"❌ 第 {i} 个请求失败")
             
-            # 短暂延迟避免过载
-            time.sleep(0.5)
+            if inter_request_delay > 0:
+                time.sleep(inter_request_delay)
         
         return results
     
-    def concurrent_inference_test(self, prompt: str, num_concurrent: int = 5, max_tokens: int = 100) -> List[PerformanceMetrics]:
+    def batch_inference_test_v2(self, prompts: List[str], max_tokens: int = 100,
+                                skip_warmup: bool = False) -> List[RequestMetrics]:
         """
-        并发推理测试
+        批量推理测试（单次请求）
+        
+        将所有提示词作为数组一次性提交到 /v1/completions，由服务端在同一批次中处理，
+        避免逐个请求带来的往返开销。
         
         Args:
-            prompt: 测试提示词
-            num_concurrent: 并发数量
+            prompts: 提示词列表
             max_tokens: 最大生成token数
+            skip_warmup: 是否跳过测试前的预热
             
         Returns:
-            List[PerformanceMetrics]: 性能指标列表
+            List[RequestMetrics]: 性能指标列表，与输入提示词顺序一致
         """
+        if not prompts:
+            return []
+        
+        self._ensure_warmup(skip_warmup)
+        print(f"🚀 开始批量测试（单次请求），共 {len(prompts)} 个提示词...")
+        
+        payload = {
+            "model": self._model_id,
+            "prompt": prompts,
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "stream": False
+        }
+        
+        start_time = time.perf_counter()
+        try:
+            response = self.client.post(
+                f"{self.base_url}/v1/completions",
+                content=orjson.dumps(payload),
+                timeout=60 * len(prompts)
+            )
+        except httpx.HTTPError as e:
+            print(f"❌ 请求异常: {e}")
+            return []
+        end_time = time.perf_counter()
+        
+        if response.status_code != 200:
+            print(f"❌ API请求失败: {response.status_code} - {response.text}")
+            return []
+        
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            print(f"❌ 请求异常: {e}")
+            return []
+        response_time = end_time - start_time
+        
+        # 服务端按index返回与输入对齐的结果
+        choices = sorted(data.get('choices') or [], key=lambda c: c.get('index') or 0)
+        if not choices:
+            print("❌ 响应中没有生成结果")
+            return []
+        
+        # usage是整批的汇总值，按各结果的长度（有分词器时为token数，否则为字符数）
+        # 估算每个结果的token数，再按token占比拆分总响应时间
+        measure = self.count_tokens if self._get_encoder() is not None else len
+        texts = [c.get('text') or '' for c in choices]
+        text_lengths = [measure(text) for text in texts]
+        total_length = sum(text_lengths)
+        prompt_lengths = [measure(p) for p in prompts[:len(choices)]]
+        usage = data.get('usage') or {}
+        total_completion = usage.get('completion_tokens', total_length if measure is not len else 0)
+        total_prompt = usage.get('prompt_tokens', sum(prompt_lengths) if measure is not len else 0)
+        total_prompt_length = sum(prompt_lengths) or len(choices)
+        
         results = []
-        threads = []
+        for i, (text_length, prompt_length) in enumerate(zip(text_lengths, prompt_lengths), 1):
+            weight = text_length / total_length if total_length else 1 / len(choices)
+            completion_tokens = round(total_completion * weight)
+            prompt_tokens = round(total_prompt * prompt_length / total_prompt_length)
+            choice_usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+            metrics = self._record_metrics(response_time * weight, choice_usage)
+            results.append(metrics)
+            print(f"✅ 第 {i} 个结果 - 分摊响应时间: {metrics.response_time:.2f}s, TPS: {metrics.tokens_per_second:.2f}")
         
-        def worker():
-            metrics = self.single_inference_test(prompt, max_tokens)
-            if metrics:
-                results.append(metrics)
+        print(f"✅ 批量请求完成 - 总耗时: {response_time:.2f}s, 成功: {len(results)}/{len(prompts)}")
+        return results
+    
+    def concurrent_inference_test(self, prompt: str, num_concurrent: int = 5, max_tokens: int = 100,
+                                  skip_warmup: bool = False) -> List[RequestMetrics]:
+        """
+        并发推理测试
         
+        Args:
+            prompt: 测试提示词
+            num_concurrent: 并发数量
+            max_tokens: 最大生成token数
+            skip_warmup: 是否跳过测试前的预热
+            
+        Returns:
+            List[RequestMetrics]: 性能指标列表
+        """
+        self._ensure_warmup(skip_warmup)
         print(f"🔄 开始并发测试，并发数: {num_concurrent}")
-        start_time = time.time()
-        
-        # 创建并启动线程
-        for i in range(num_concurrent):
-            thread = threading.Thread(target=worker)
-            threads.append(thread)
-            thread.start()
+        start_time = time.perf_counter()
         
-        # 等待所有线程完成
-        for thread in threads:
-            thread.join()
+        # 使用asyncio协程代替每请求一个线程，所有请求共享一个连接池
+        results = asyncio.run(self._run_concurrent(prompt, num_concurrent, max_tokens))
         
-        end_time = time.time()
-        total_time = end_time - start_time
+        total_time = time.perf_counter() - start_time
         
         print(f"✅ 并发测试完成 - 总耗时: {total_time:.2f}s, 成功请求: {len(results)}/{num_concurrent}")
         
         return results
     
-    def stress_test(self, prompt: str, duration_seconds: int = 60, max_tokens: int = 50) -> List[PerformanceMetrics]:
+    def stress_test(self, prompt: str, duration_seconds: int = 60, max_tokens: int = 50,
+                    target_rps: Optional[float] = None, skip_warmup: bool = False) -> List[RequestMetrics]:
         """
         压力测试
         
@@ -234,28 +1284,52 @@ class LMStudioPerformanceTester:
             prompt: 测试提示词
             duration_seconds: 测试持续时间（秒）
             max_tokens: 最大生成token数
+            target_rps: 目标每秒请求数，None表示不限速、请求完成后立即发送下一个
+            skip_warmup: 是否跳过测试前的预热
             
         Returns:
-            List[PerformanceMetrics]: 性能指标列表
+            List[RequestMetrics]: 性能指标列表
         """
+        self._ensure_warmup(skip_warmup)
+        # 进度行只统计本轮压力测试的请求
+        self.reset_live_stats()
         results = []
-        start_time = time.time()
+        start_time = time.perf_counter()
         request_count = 0
         
+        # 压力测试反复发送同一请求，使用预编码请求体的专用请求函数
+        runner = self.make_fixed_runner(prompt, max_tokens)
+        
+        # 按目标速率排定每个请求的发送时刻，而不是在请求之间固定休眠
+        interval = 1.0 / target_rps if target_rps else 0.0
+        next_send = start_time
+        
         print(f"⚡ 开始压力测试，持续时间: {duration_seconds}秒")
         
-        while time.time() - start_time < duration_seconds:
-            request_count += 1
-            print(f"📊 压力测试请求 #{request_count}")
+        next_progress = start_time + 1.0
+        while time.perf_counter() - start_time < duration_seconds:
+            if interval:
+                time.sleep(max(0.0, next_send - time.perf_counter()))
+                next_send += interval
+                if time.perf_counter() - start_time >= duration_seconds:
+                    break
             
-            metrics = self.single_inference_test(prompt, max_tokens)
+            request_count += 1
+            metrics = runner()
             if metrics:
                 results.append(metrics)
             
-            # 短暂延迟
-            time.sleep(0.1)
+            # 每秒输出一次进度，实时统计为增量维护的值，不随请求数增长而变慢
+            now = time.perf_counter()
+            if now >= next_progress:
+                next_progress = now + 1.0
+                stats = self.live_stats()
+                print(f"📊 {now - start_time:.0f}s - 请求数: {request_count}, "
+                      f"P50: {stats['rt_p50']:.3f}s, P95: {stats['rt_p95']:.3f}s, "
+                      f"P99: {stats['rt_p99']:.3f}s, 平均TPS: {stats['tps_mean']:.2f}")
         
-        total_time = time.time() - start_time
+        runner.close()
+        total_time = time.perf_counter() - start_time
         print(f"✅ 压力测试完成 - 总耗时: {total_time:.2f}s, 总请求: {request_count}, 成功: {len(results)}")
         
         return results
@@ -270,43 +1344,106 @@ class LMStudioPerformanceTester:
         if not self.metrics_history:
             return {"error": "没有性能数据"}
         
-        response_times = [m.response_time for m in self.metrics_history]
-        tokens_per_second = [m.tokens_per_second for m in self.metrics_history]
-        memory_usage = [m.memory_usage for m in self.metrics_history]
-        cpu_usage = [m.cpu_usage for m in self.metrics_history]
+        # 一次性将指标物化为结构化数组，后续统计全部走NumPy向量化计算
+        nan = float('nan')
+        arr = np.fromiter(
+            ((m.response_time, m.tokens_per_second, m.completion_tokens, m.total_tokens,
+              nan if m.ttft is None else m.ttft,
+              nan if m.itl_p50 is None else m.itl_p50,
+              nan if m.itl_p99 is None else m.itl_p99,
+              nan if m.decode_tps is None else m.decode_tps)
+             for m in self.metrics_history),
+            dtype=_METRICS_DTYPE,
+            count=len(self.metrics_history)
+        )
+        rt = np.ascontiguousarray(arr['rt'])
+        tps = np.ascontiguousarray(arr['tps'])
+        rt_mean, rt_std, rt_min, rt_max = _stat_kernel(rt)
+        tps_mean, _, tps_min, tps_max = _stat_kernel(tps)
+        p50, p95, p99 = _percentiles(rt, [50, 95, 99])
         
         report = {
             "测试概览": {
-                "总请求数": len(self.metrics_history),
+                "总请求数": len(arr),
                 "测试时间范围": f"{self.metrics_history[0].timestamp} 到 {self.metrics_history[-1].timestamp}"
             },
             "响应时间统计": {
-                "平均值": f"{statistics.mean(response_times):.3f}s",
-                "中位数": f"{statistics.median(response_times):.3f}s",
-                "最小值": f"{min(response_times):.3f}s",
-                "最大值": f"{max(response_times):.3f}s",
-                "标准差": f"{statistics.stdev(response_times) if len(response_times) > 1 else 0:.3f}s"
+                "平均值": f"{rt_mean:.3f}s",
+                "中位数": f"{p50:.3f}s",
+                "最小值": f"{rt_min:.3f}s",
+                "最大值": f"{rt_max:.3f}s",
+                "标准差": f"{rt_std:.3f}s",
+                "P95": f"{p95:.3f}s",
+                "P99": f"{p99:.3f}s"
             },
             "吞吐量统计": {
-                "平均TPS": f"{statistics.mean(tokens_per_second):.2f} tokens/s",
-                "最大TPS": f"{max(tokens_per_second):.2f} tokens/s",
-                "最小TPS": f"{min(tokens_per_second):.2f} tokens/s"
-            },
-            "系统资源": {
-                "平均内存使用": f"{statistics.mean(memory_usage):.1f} MB",
-                "平均CPU使用率": f"{statistics.mean(cpu_usage):.1f}%",
-                "最大内存使用": f"{max(memory_usage):.1f} MB",
-                "最大CPU使用率": f"{max(cpu_usage):.1f}%"
+                "平均TPS": f"{tps_mean:.2f} tokens/s",
+                "最大TPS": f"{tps_max:.2f} tokens/s",
+                "最小TPS": f"{tps_min:.2f} tokens/s"
             },
+            "系统资源": self._system_report(),
             "Token统计": {
-                "总生成Token数": sum(m.completion_tokens for m in self.metrics_history),
-                "平均每次生成Token数": f"{statistics.mean([m.completion_tokens for m in self.metrics_history]):.1f}",
-                "总处理Token数": sum(m.total_tokens for m in self.metrics_history)
+                "总生成Token数": int(arr['ct'].sum()),
+                "平均每次生成Token数": f"{arr['ct'].mean():.1f}",
+                "总处理Token数": int(arr['tt'].sum())
             }
         }
         
+        ttft = arr['ttft'][~np.isnan(arr['ttft'])]
+        if ttft.size:
+            report["流式指标"] = {
+                "流式请求数": int(ttft.size),
+                "平均首Token延迟": f"{ttft.mean():.3f}s",
+                "首Token延迟中位数": f"{np.median(ttft):.3f}s",
+            }
+            decoded = ~np.isnan(arr['dtps'])
+            if decoded.any():
+                report["流式指标"].update({
+                    "Token间延迟P50": f"{arr['itl50'][decoded].mean() * 1000:.1f}ms",
+                    "Token间延迟P99": f"{arr['itl99'][decoded].mean() * 1000:.1f}ms",
+                    "平均解码TPS": f"{arr['dtps'][decoded].mean():.2f} tokens/s"
+                })
+        
+        if self.warmup_times:
+            report["预热"] = {
+                "预热请求数": len(self.warmup_times),
+                "首次响应时间": f"{self.warmup_times[0]:.3f}s",
+                "平均响应时间": f"{np.mean(self.warmup_times):.3f}s"
+            }
+        
+        if self.cache_misses or self.cache_hits or self.semantic_hits:
+            hits = self.cache_hits + self.semantic_hits
+            report["缓存统计"] = {
+                "精确命中次数": self.cache_hits,
+                "语义命中次数": self.semantic_hits,
+                "未命中次数": self.cache_misses,
+                "命中率": f"{hits / (hits + self.cache_misses) * 100:.1f}%"
+            }
+        
         return report
     
+    def _system_report(self) -> Dict[str, str]:
+        """
+        统计测试时间窗口内的系统资源采样
+        
+        Returns:
+            Dict[str, str]: 系统资源统计
+        """
+        first, last = self.metrics_history[0], self.metrics_history[-1]
+        t, mem, cpu = self._system_sample_arrays()
+        window = (t >= first.t_end - first.response_time) & (t <= last.t_end)
+        if window.any():
+            mem, cpu = mem[window], cpu[window]
+        else:
+            # 测试时间短于采样间隔时，退回到与各请求最近的采样
+            mem, cpu = self.system_metrics_for(list(self.metrics_history))
+        return {
+            "平均内存使用": f"{mem.mean():.1f} MB",
+            "平均CPU使用率": f"{cpu.mean():.1f}%",
+            "最大内存使用": f"{mem.max():.1f} MB",
+            "最大CPU使用率": f"{cpu.max():.1f}%"
+        }
+    
     def print_report(self):
         """打印性能报告"""
         report = self.generate_performance_report()
@@ -326,17 +1463,41 @@ class LMStudioPerformanceTester:
         
         print("\n" + "="*60)
     
-    def save_detailed_results(self, filename: str = None):
+    def save_detailed_results(self, filename: str = None, output_format: str = "json"):
         """
-        保存详细测试结果到JSON文件
+        保存详细测试结果到文件
         
         Args:
             filename: 文件名，如果为None则自动生成
+            output_format: "json" 写入单个JSON文档，每条记录附带最近一次系统采样的内存/CPU；
+                "ndjson" 首行为汇总报告和列式的系统采样序列，之后每行一条请求指标记录，
+                逐条流式写出，不在内存中构建完整列表
         """
+        if output_format not in ("json", "ndjson"):
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"lm_studio_performance_{timestamp}.json"
+            filename = f"lm_studio_performance_{timestamp}.{output_format}"
+        
+        if output_format == "ndjson":
+            t, mem, cpu = self._system_sample_arrays()
+            header = {
+                "test_summary": self.generate_performance_report(),
+                "system_samples": {"t": t, "mem_mb": mem, "cpu_pct": cpu}
+            }
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(header, option=orjson.OPT_SERIALIZE_NUMPY))
+                f.write(b"\n")
+                for m in self.metrics_history:
+                    # orjson原生序列化dataclass，无需先转换为dict
+                    f.write(orjson.dumps(m))
+                    f.write(b"\n")
+            print(f"💾 详细结果已保存到: {filename}")
+            return
         
+        metrics = list(self.metrics_history)
+        memory_usage, cpu_usage = self.system_metrics_for(metrics)
         data = {
             "test_summary": self.generate_performance_report(),
             "detailed_metrics": [
@@ -347,15 +1508,19 @@ class LMStudioPerformanceTester:
                     "total_tokens": m.total_tokens,
                     "prompt_tokens": m.prompt_tokens,
                     "completion_tokens": m.completion_tokens,
-                    "memory_usage": m.memory_usage,
-                    "cpu_usage": m.cpu_usage
+                    "memory_usage": float(mem),
+                    "cpu_usage": float(cpu),
+                    "ttft": m.ttft,
+                    "itl_p50": m.itl_p50,
+                    "itl_p99": m.itl_p99,
+                    "decode_tps": m.decode_tps
                 }
-                for m in self.metrics_history
+                for m, mem, cpu in zip(metrics, memory_usage, cpu_usage)
             ]
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         print(f"💾 详细结果已保存到: {filename}")
 
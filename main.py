@@ -9,7 +9,7 @@ import sys
 from lm_studio_tester import LMStudioPerformanceTester, get_test_prompts
 
 
-def run_single_test(tester: LMStudioPerformanceTester):
+def run_single_test(tester: LMStudioPerformanceTester, stream: bool = False):
     """运行单次推理测试"""
     print("\n🔍 单次推理测试")
     print("-" * 40)
@@ -17,25 +17,33 @@ def run_single_test(tester: LMStudioPerformanceTester):
     prompt = "请简单介绍一下人工智能的基本概念，不超过100字。"
     print(f"📝 测试提示词: {prompt}")
     
-    metrics = tester.single_inference_test(prompt, max_tokens=150)
+    metrics = tester.single_inference_test(prompt, max_tokens=150, stream=stream)
     if metrics:
         print(f"✅ 测试完成!")
         print(f"   响应时间: {metrics.response_time:.3f}秒")
         print(f"   生成速度: {metrics.tokens_per_second:.2f} tokens/秒")
+        if metrics.ttft is not None:
+            print(f"   首Token延迟: {metrics.ttft:.3f}秒")
+        if metrics.decode_tps is not None:
+            print(f"   解码速度: {metrics.decode_tps:.2f} tokens/秒")
         print(f"   生成Token数: {metrics.completion_tokens}")
-        print(f"   内存使用: {metrics.memory_usage:.1f} MB")
-        print(f"   CPU使用率: {metrics.cpu_usage:.1f}%")
+        memory_usage, cpu_usage = tester.get_system_metrics()
+        print(f"   内存使用: {memory_usage:.1f} MB")
+        print(f"   CPU使用率: {cpu_usage:.1f}%")
     else:
         print("❌ 单次测试失败")
 
 
-def run_batch_test(tester: LMStudioPerformanceTester):
+def run_batch_test(tester: LMStudioPerformanceTester, batched: bool = False, workers: int = 1):
     """运行批量推理测试"""
     print("\n📦 批量推理测试")
     print("-" * 40)
     
     prompts = get_test_prompts()[:5]  # 使用前5个测试提示词
-    results = tester.batch_inference_test(prompts, max_tokens=100)
+    if batched:
+        results = tester.batch_inference_test_v2(prompts, max_tokens=100)
+    else:
+        results = tester.batch_inference_test(prompts, max_tokens=100, max_workers=workers)
     
     if results:
         avg_response_time = sum(r.response_time for r in results) / len(results)
@@ -66,7 +74,7 @@ def run_concurrent_test(tester: LMStudioPerformanceTester):
         print(f"   总吞吐量: {total_tps:.2f} tokens/秒")
 
 
-def run_stress_test(tester: LMStudioPerformanceTester):
+def run_stress_test(tester: LMStudioPerformanceTester, target_rps: float = None):
     """运行压力测试"""
     print("\n⚡ 压力测试")
     print("-" * 40)
@@ -75,7 +83,7 @@ def run_stress_test(tester: LMStudioPerformanceTester):
     duration = 30  # 测试30秒
     
     print(f"⏱️  将进行 {duration} 秒的压力测试...")
-    results = tester.stress_test(prompt, duration_seconds=duration, max_tokens=50)
+    results = tester.stress_test(prompt, duration_seconds=duration, max_tokens=50, target_rps=target_rps)
     
     if results:
         success_rate = len(results) / duration * 100  # 每秒成功请求数
@@ -87,23 +95,24 @@ def run_stress_test(tester: LMStudioPerformanceTester):
         print(f"   平均生成速度: {avg_tps:.2f} tokens/秒")
 
 
-def run_comprehensive_test(tester: LMStudioPerformanceTester):
+def run_comprehensive_test(tester: LMStudioPerformanceTester, batched: bool = False, stream: bool = False,
+                           target_rps: float = None, output_format: str = "json", workers: int = 1):
     """运行综合测试"""
     print("\n🎯 综合性能测试")
     print("=" * 50)
     
     # 依次运行各种测试
-    run_single_test(tester)
-    run_batch_test(tester)
+    run_single_test(tester, stream)
+    run_batch_test(tester, batched, workers)
     run_concurrent_test(tester)
-    run_stress_test(tester)
+    run_stress_test(tester, target_rps)
     
     # 生成最终报告
     print("\n" + "=" * 50)
     tester.print_report()
     
     # 保存详细结果
-    tester.save_detailed_results()
+    tester.save_detailed_results(output_format=output_format)
 
 
 def main():
@@ -117,6 +126,16 @@ def main():
                        default="comprehensive", help="测试类型 (默认: comprehensive)")
     parser.add_argument("--list", action="store_true",
                        help="列出所有可用模型")
+    parser.add_argument("--batched", action="store_true",
+                       help="批量测试时将所有提示词合并为一次 /v1/completions 请求")
+    parser.add_argument("--stream", action="store_true",
+                       help="单次测试使用流式输出，统计首Token延迟和Token间延迟")
+    parser.add_argument("--rps", type=float, default=None,
+                       help="压力测试的目标每秒请求数 (默认不限速)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="批量测试并行执行的线程数 (默认: 1，即顺序执行)")
+    parser.add_argument("--output-format", choices=["json", "ndjson"], default="json",
+                       help="详细结果文件格式 (默认: json)")
     
     args = parser.parse_args()
     
@@ -154,15 +173,16 @@ def main():
     # 根据参数运行相应测试
     try:
         if args.test_type == "single":
-            run_single_test(tester)
+            run_single_test(tester, args.stream)
         elif args.test_type == "batch":
-            run_batch_test(tester)
+            run_batch_test(tester, args.batched, args.workers)
         elif args.test_type == "concurrent":
             run_concurrent_test(tester)
         elif args.test_type == "stress":
-            run_stress_test(tester)
+            run_stress_test(tester, args.rps)
         elif args.test_type == "comprehensive":
-            run_comprehensive_test(tester)
+            run_comprehensive_test(tester, args.batched, args.stream, args.rps, args.output_format,
+                                   args.workers)
         
         print("\n✅ 所有测试完成!")
         
@@ -171,7 +191,7 @@ def main():
         if tester.metrics_history:
             print("📊 生成已完成测试的报告...")
             tester.print_report()
-            tester.save_detailed_results()
+            tester.save_detailed_results(output_format=args.output_format)
     except Exception as e:
         print(f"\n❌ 测试过程中发生错误: {e}")
         sys.exit(1)
@@ -4,193 +4,674 @@
 生成图表和可视化报告
 """
 
-import json
+import hashlib
+import ijson
+import matplotlib
+# 记录环境默认的后端（可能是尚未解析的自动选择标记），--show时切换回去
+_DEFAULT_BACKEND = dict.__getitem__(matplotlib.rcParams, 'backend')
+# 默认使用非交互的Agg后端，只写PNG文件时不加载任何GUI工具包
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+# 设置中文字体（进程级全局配置，模块导入时设置一次）
+plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+plt.rcParams['axes.unicode_minus'] = False
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import argparse
 import os
-from typing import List, Dict, Any
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # orjson未安装时退回标准库json
+    import json
+    _json_loads = json.loads
+    
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+
+# 超过该点数的时间序列在绘制前使用LTTB降采样
+LTTB_THRESHOLD = 3000
+# 降采样后保留的点数（约为图像宽度像素数的两倍）
+LTTB_POINTS = 2000
+# 超过该大小的结果文件使用ijson流式解析，否则一次性读入后用orjson解析
+STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024
+# 解析结果的缓存目录，按结果文件内容的SHA-1命名
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ai_perf_tool')
+# 列数组的字段名，同时用作缓存文件中的数组名
+COLUMNS = ('timestamps', 'response_times', 'tps', 'memory', 'cpu')
+# 图表类型与生成方法的对应关系，按generate_all_charts的生成顺序排列
+CHARTS = {
+    "response": "create_response_time_chart",
+    "throughput": "create_throughput_chart",
+    "resource": "create_resource_usage_chart",
+    "distribution": "create_performance_distribution",
+    "dashboard": "create_summary_dashboard",
+}
+# 分布直方图的分箱数，独立图表与仪表板共用同一份分箱结果
+HIST_BINS = 20
+# 每条折线最多绘制的数据点标记数，点数更多时按间隔绘制
+MAX_MARKERS = 200
+
+
+def _lttb_core_numpy(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB选点（NumPy实现），逐桶计算三角形面积
+    
+    Args:
+        x: 横坐标（float64，单调递增）
+        y: 纵坐标（float64）
+        n_out: 输出点数，需满足 3 <= n_out < len(x)
+        
+    Returns:
+        np.ndarray: 选中点的下标
+    """
+    n = len(x)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < n_out - 1 else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def _lttb_core_loop(x, y, n_out):
+    """
+    LTTB选点（标量循环版本，供Numba编译），桶均值与面积比较都在循环中完成，不分配中间数组
+    """
+    n = x.size
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[n_out - 1] = n - 1
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    a = 0
+    for i in range(n_out - 2):
+        lo = edges[i]
+        hi = edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < n_out - 1 else n
+        avg_x = 0.0
+        avg_y = 0.0
+        for j in range(hi, next_hi):
+            avg_x += x[j]
+            avg_y += y[j]
+        avg_x /= next_hi - hi
+        avg_y /= next_hi - hi
+        best = lo
+        best_area = -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        a = best
+        idx[i + 1] = a
+    return idx
+
+
+_numba_lttb_core = None
+
+
+def _get_numba_lttb_core() -> Optional[Callable]:
+    """
+    首次需要降采样时才导入numba并编译LTTB内核，避免每次启动都付出导入开销
+    
+    Returns:
+        Callable: 编译后的内核，numba未安装时返回None
+    """
+    global _numba_lttb_core
+    if _numba_lttb_core is None:
+        try:
+            from numba import njit
+        except ImportError:  # numba为可选依赖，未安装时LTTB使用NumPy实现
+            _numba_lttb_core = False
+        else:
+            _numba_lttb_core = njit(cache=True, fastmath=True)(_lttb_core_loop)
+    return _numba_lttb_core or None
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, n_out: int = LTTB_POINTS) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets降采样，保留曲线的视觉形状
+    
+    首尾点固定保留，中间的点均分为n_out-2个桶，每个桶选出与上一个选中点、
+    下一个桶均值点构成三角形面积最大的点。
+    
+    Args:
+        x: 横坐标（数值型，单调递增）
+        y: 纵坐标
+        n_out: 输出点数
+        
+    Returns:
+        np.ndarray: 选中点的下标
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    core = (_get_numba_lttb_core() if n > LTTB_THRESHOLD else None) or _lttb_core_numpy
+    return core(np.ascontiguousarray(x, dtype=np.float64),
+                np.ascontiguousarray(y, dtype=np.float64), n_out)
+
+
+def _stats(values: np.ndarray) -> Dict[str, float]:
+    """
+    计算一列数据的汇总统计
+    
+    Args:
+        values: 数值列
+        
+    Returns:
+        Dict[str, float]: 最小值、最大值、均值、标准差，空数组时均为nan
+    """
+    if not len(values):
+        return {"min": np.nan, "max": np.nan, "mean": np.nan, "std": np.nan}
+    # 列以float32存储，累加时使用float64避免精度损失
+    return {"min": float(values.min()), "max": float(values.max()),
+            "mean": float(values.mean(dtype=np.float64)), "std": float(values.std(dtype=np.float64))}
 
 
 class PerformanceVisualizer:
     """性能数据可视化器"""
     
-    def __init__(self, data_file: str):
+    def __init__(self, data_file: str, show: bool = False, dpi: int = 120, use_cache: bool = True):
         """
         初始化可视化器
         
         Args:
             data_file: 性能数据JSON文件路径
+            show: 保存图表后是否弹出窗口显示（默认只保存文件）
+            dpi: 保存图片的分辨率
+            use_cache: 是否使用磁盘缓存的解析结果
         """
         self.data_file = data_file
+        self.show = show
+        self.dpi = dpi
+        self.use_cache = use_cache
         self.data = self.load_data()
+        self._prepare()
+    
+    @classmethod
+    def from_plot_data(cls, plot_data: Dict[str, Any], dpi: int = 120) -> 'PerformanceVisualizer':
+        """
+        直接从准备好的绘图数据创建可视化器（供并行生成图表的子进程使用）
+        
+        Args:
+            plot_data: _get_plot_data返回的绘图数据
+            dpi: 保存图片的分辨率
+            
+        Returns:
+            PerformanceVisualizer: 只能用于绘图的可视化器
+        """
+        visualizer = cls.__new__(cls)
+        visualizer.data_file = None
+        visualizer.show = False
+        visualizer.dpi = dpi
+        visualizer.use_cache = False
+        visualizer.data = {'test_summary': plot_data['summary']}
+        visualizer._prepare(plot_data)
+        return visualizer
+    
+    def _prepare(self, plot_data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        初始化各图表共用的状态
         
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        Args:
+            plot_data: 已准备好的绘图数据，为None时在首次绘图时由列数组计算
+        """
+        self._fig = None
+        self._plot_data = plot_data
+        # 各列的汇总统计只计算一次，图表标注和仪表板摘要直接复用
+        if plot_data is not None:
+            self.stats = plot_data['stats']
+        else:
+            self.stats = {name: _stats(getattr(self, name)) for name in COLUMNS[1:]}
     
     def load_data(self) -> Dict[str, Any]:
         """
-        加载性能数据
+        加载性能数据，优先使用磁盘缓存
+        
+        缓存以结果文件内容的SHA-1为键，文件内容变化后自动失效。
+        
+        Returns:
+            Dict[str, Any]: 除detailed_metrics以外的性能数据（test_summary）
+        """
+        cache_path = None
+        if self.use_cache:
+            try:
+                cache_path = os.path.join(CACHE_DIR, f"{self._file_digest()}.npz")
+            except FileNotFoundError:
+                raise FileNotFoundError(f"找不到数据文件: {self.data_file}")
+            if os.path.exists(cache_path):
+                try:
+                    return self._load_cache(cache_path)
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                    pass  # 缓存损坏时重新解析
+        
+        data = self._parse_file()
+        if cache_path:
+            self._save_cache(cache_path, data)
+        return data
+    
+    def _file_digest(self) -> str:
+        """
+        分块计算结果文件内容的SHA-1
         
         Returns:
-            Dict[str, Any]: 性能数据
+            str: 十六进制摘要
+        """
+        digest = hashlib.sha1()
+        with open(self.data_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _load_cache(self, cache_path: str) -> Dict[str, Any]:
         """
+        从缓存文件恢复列数组
+        
+        Args:
+            cache_path: 缓存文件路径
+            
+        Returns:
+            Dict[str, Any]: 缓存的test_summary
+        """
+        with np.load(cache_path) as cached:
+            for name in COLUMNS:
+                setattr(self, name, cached[name])
+            return {'test_summary': _json_loads(str(cached['summary']))}
+    
+    def _save_cache(self, cache_path: str, data: Dict[str, Any]) -> None:
+        """
+        将列数组写入缓存文件（先写临时文件再替换，避免留下不完整的缓存）
+        
+        Args:
+            cache_path: 缓存文件路径
+            data: load_data返回的数据
+        """
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, summary=np.array(_json_dumps(data.get('test_summary', {}))),
+                         **{name: getattr(self, name) for name in COLUMNS})
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  无法写入缓存: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def _parse_file(self) -> Dict[str, Any]:
+        """
+        解析结果文件
+        
+        常规大小的文件一次性读入并用orjson解析；超过STREAM_THRESHOLD_BYTES的文件
+        改用ijson流式解析，detailed_metrics逐条写入列数组，不在内存中保留完整的字典列表。
+        .ndjson文件按行逐条解析。
+        
+        Returns:
+            Dict[str, Any]: 除detailed_metrics以外的性能数据（test_summary）
+        """
+        try:
+            with open(self.data_file, 'rb') as f:
+                if self.data_file.endswith('.ndjson'):
+                    return self._parse_ndjson(f)
+                if os.fstat(f.fileno()).st_size <= STREAM_THRESHOLD_BYTES:
+                    data = _json_loads(f.read())
+                    self._build_columns(data.get('detailed_metrics', []))
+                    return {'test_summary': data.get('test_summary', {})}
+                
+                summary = next(ijson.items(f, 'test_summary', use_float=True), {})
+                f.seek(0)
+                self._build_columns(ijson.items(f, 'detailed_metrics.item', use_float=True))
+            return {'test_summary': summary}
         except FileNotFoundError:
             raise FileNotFoundError(f"找不到数据文件: {self.data_file}")
-        except json.JSONDecodeError:
+        except (ValueError, ijson.JSONError):
             raise ValueError(f"数据文件格式错误: {self.data_file}")
     
+    def _parse_ndjson(self, f) -> Dict[str, Any]:
+        """
+        解析NDJSON结果文件
+        
+        首行为汇总报告和列式的系统采样序列，之后每行一条请求指标记录；记录中没有内存/CPU，
+        按请求完成时刻（t_end）匹配最近的一次系统采样。
+        
+        Args:
+            f: 以二进制模式打开的文件对象
+            
+        Returns:
+            Dict[str, Any]: test_summary
+        """
+        header = _json_loads(f.readline() or b'{}')
+        t_end = []
+        
+        def records():
+            for line in f:
+                if not line.strip():
+                    continue
+                m = _json_loads(line)
+                t_end.append(m.get('t_end', 0.0))
+                m['memory_usage'] = m['cpu_usage'] = np.nan
+                yield m
+        
+        self._build_columns(records())
+        samples = header.get('system_samples') or {}
+        t = np.asarray(samples.get('t', []), dtype=np.float64)
+        if len(t) and t_end:
+            # searchsorted给出右侧邻居，再与左侧邻居比较取更近的一个
+            t_end = np.asarray(t_end, dtype=np.float64)
+            right = np.clip(np.searchsorted(t, t_end), 0, len(t) - 1)
+            left = np.maximum(right - 1, 0)
+            nearest = np.where(np.abs(t[left] - t_end) <= np.abs(t[right] - t_end), left, right)
+            self.memory = np.asarray(samples['mem_mb'], dtype=np.float32)[nearest]
+            self.cpu = np.asarray(samples['cpu_pct'], dtype=np.float32)[nearest]
+        return {'test_summary': header.get('test_summary', {})}
+    
+    def _build_columns(self, records) -> None:
+        """
+        将逐条到达的指标记录写入列数组
+        
+        数值列使用预分配的float32数组（绘图精度足够，内存减半），容量不足时翻倍扩容；
+        时间戳在最后整体向量化解析为datetime64。
+        
+        Args:
+            records: 指标记录的可迭代对象
+        """
+        fields = ('response_time', 'tokens_per_second', 'memory_usage', 'cpu_usage')
+        capacity = 1024
+        columns = {name: np.empty(capacity, dtype=np.float32) for name in fields}
+        timestamps = []
+        n = 0
+        for m in records:
+            if n == capacity:
+                capacity *= 2
+                for name in fields:
+                    columns[name] = np.resize(columns[name], capacity)
+            for name in fields:
+                columns[name][n] = m[name]
+            timestamps.append(m['timestamp'])
+            n += 1
+        
+        self.timestamps = np.array(timestamps, dtype='datetime64[us]')
+        self.response_times = columns['response_time'][:n].copy()
+        self.tps = columns['tokens_per_second'][:n].copy()
+        self.memory = columns['memory_usage'][:n].copy()
+        self.cpu = columns['cpu_usage'][:n].copy()
+    
+    def _downsample(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        取得用于绘制折线的时间序列，点数过多时使用LTTB降采样
+        
+        Args:
+            values: 与timestamps对齐的数值列
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (时间戳, 数值)
+        """
+        if len(values) <= LTTB_THRESHOLD:
+            return self.timestamps, values
+        idx = _lttb(self.timestamps.astype(np.int64).astype(np.float64), values)
+        return self.timestamps[idx], values[idx]
+    
+    def _get_plot_data(self) -> Dict[str, Any]:
+        """
+        准备所有图表绘制所需的数据（只计算一次）
+        
+        独立图表与仪表板绘制的是同样的曲线和分布，降采样后的序列和直方图分箱结果在这里
+        统一计算，各图表只负责绘制；并行生成时也只需把这份体积很小的数据传给子进程。
+        
+        Returns:
+            Dict[str, Any]: 请求数、降采样后的时间序列、直方图、汇总统计、标记间隔和测试摘要
+        """
+        if self._plot_data is None:
+            count = len(self.timestamps)
+            # 标记逐个绘制开销远大于折线本身，按实际绘制的点数控制标记间隔
+            plotted = LTTB_POINTS if count > LTTB_THRESHOLD else count
+            self._plot_data = {
+                "count": count,
+                "series": {name: self._downsample(getattr(self, name)) for name in COLUMNS[1:]},
+                "histograms": {name: np.histogram(getattr(self, name), bins=HIST_BINS)
+                               for name in ('response_times', 'tps')},
+                "stats": self.stats,
+                "markevery": max(1, plotted // MAX_MARKERS),
+                "summary": self.data.get('test_summary', {}),
+            }
+        return self._plot_data
+    
+    def _draw_series(self, ax: plt.Axes, name: str, fmt: str, **kwargs) -> None:
+        """
+        绘制一列数据的时间序列
+        
+        Args:
+            ax: 目标坐标轴
+            name: 列名（如 'response_times'）
+            fmt: 线型格式字符串
+            **kwargs: 传给ax.plot的其余参数
+        """
+        data = self._get_plot_data()
+        ax.plot(*data['series'][name], fmt, markevery=data['markevery'], **kwargs)
+    
+    def _draw_series_collection(self, ax: plt.Axes, name: str, color: str) -> None:
+        """
+        以单个LineCollection绘制一列数据的时间序列（仪表板使用，不绘制数据点标记）
+        
+        所有线段在一次Agg调用中批量绘制，省去Line2D的标记绘制流程。
+        
+        Args:
+            ax: 目标坐标轴
+            name: 列名（如 'response_times'）
+            color: 线条颜色
+        """
+        timestamps, values = self._get_plot_data()['series'][name]
+        if len(values) < 2:
+            self._draw_series(ax, name, color, marker='o', markersize=2)
+            return
+        
+        points = np.column_stack((mdates.date2num(timestamps), values))
+        segments = np.stack((points[:-1], points[1:]), axis=1)
+        ax.add_collection(LineCollection(segments, colors=color, linewidths=1.5))
+        # 集合不会自动更新坐标范围，按数据范围手动设置
+        ax.set_xlim(points[0, 0], points[-1, 0])
+        ax.set_ylim(*self._padded_range(values))
+        ax.xaxis_date()
+    
+    @staticmethod
+    def _padded_range(values: np.ndarray) -> Tuple[float, float]:
+        """
+        计算两侧留出5%边距的坐标范围（与matplotlib默认边距一致）
+        
+        Args:
+            values: 数值列
+            
+        Returns:
+            Tuple[float, float]: (下限, 上限)
+        """
+        low, high = float(values.min()), float(values.max())
+        margin = (high - low) * 0.05 or max(abs(low) * 0.05, 1.0)
+        return low - margin, high + margin
+    
+    def _draw_histogram(self, ax: plt.Axes, name: str, color: str) -> None:
+        """
+        绘制一列数据的分布直方图，直接使用准备好的分箱结果以柱状图绘制
+        
+        Args:
+            ax: 目标坐标轴
+            name: 列名（如 'response_times'）
+            color: 柱体颜色
+        """
+        counts, edges = self._get_plot_data()['histograms'][name]
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge',
+               alpha=0.7, color=color, edgecolor='black')
+    
+    def _get_figure(self, figsize: Tuple[float, float]) -> plt.Figure:
+        """
+        获取复用的Figure，清空后调整为指定尺寸
+        
+        所有图表共用同一个Figure和画布，窗口被关闭后才重新创建。
+        
+        Args:
+            figsize: 图表尺寸（英寸）
+            
+        Returns:
+            plt.Figure: 已清空的Figure
+        """
+        if self._fig is None or not plt.fignum_exists(self._fig.number):
+            self._fig = plt.figure(figsize=figsize)
+        else:
+            self._fig.clear()
+            self._fig.set_size_inches(figsize)
+        return self._fig
+    
+    def _save(self, fig: plt.Figure, filename: str) -> None:
+        """
+        保存图表，需要时弹出窗口显示
+        
+        Args:
+            fig: 要保存的Figure
+            filename: 输出文件名
+        """
+        fig.savefig(filename, dpi=self.dpi, bbox_inches='tight')
+        if self.show:
+            plt.show()
+    
     def create_response_time_chart(self) -> None:
         """创建响应时间图表"""
-        metrics = self.data.get('detailed_metrics', [])
-        if not metrics:
+        if not self._get_plot_data()['count']:
             print("❌ 没有详细指标数据")
             return
         
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in metrics]
-        response_times = [m['response_time'] for m in metrics]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, response_times, 'b-', marker='o', markersize=4, linewidth=2)
-        plt.title('响应时间趋势', fontsize=16, fontweight='bold')
-        plt.xlabel('时间', fontsize=12)
-        plt.ylabel('响应时间 (秒)', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        fig = self._get_figure((12, 6))
+        ax = fig.subplots()
+        self._draw_series(ax, 'response_times', 'b-', marker='o', markersize=4, linewidth=2)
+        ax.set_title('响应时间趋势', fontsize=16, fontweight='bold')
+        ax.set_xlabel('时间', fontsize=12)
+        ax.set_ylabel('响应时间 (秒)', fontsize=12)
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis='x', rotation=45)
+        fig.tight_layout()
         
         # 添加统计信息
-        avg_time = np.mean(response_times)
-        plt.axhline(y=avg_time, color='r', linestyle='--', alpha=0.7, 
+        avg_time = self.stats['response_times']['mean']
+        ax.axhline(y=avg_time, color='r', linestyle='--', alpha=0.7, 
                    label=f'平均值: {avg_time:.3f}s')
-        plt.legend()
+        ax.legend()
         
-        plt.savefig('response_time_trend.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        self._save(fig, 'response_time_trend.png')
         print("📊 响应时间图表已保存: response_time_trend.png")
     
     def create_throughput_chart(self) -> None:
         """创建吞吐量图表"""
-        metrics = self.data.get('detailed_metrics', [])
-        if not metrics:
+        if not self._get_plot_data()['count']:
             print("❌ 没有详细指标数据")
             return
         
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in metrics]
-        tps_values = [m['tokens_per_second'] for m in metrics]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(timestamps, tps_values, 'g-', marker='s', markersize=4, linewidth=2)
-        plt.title('吞吐量趋势 (Tokens per Second)', fontsize=16, fontweight='bold')
-        plt.xlabel('时间', fontsize=12)
-        plt.ylabel('Tokens/秒', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        fig = self._get_figure((12, 6))
+        ax = fig.subplots()
+        self._draw_series(ax, 'tps', 'g-', marker='s', markersize=4, linewidth=2)
+        ax.set_title('吞吐量趋势 (Tokens per Second)', fontsize=16, fontweight='bold')
+        ax.set_xlabel('时间', fontsize=12)
+        ax.set_ylabel('Tokens/秒', fontsize=12)
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis='x', rotation=45)
+        fig.tight_layout()
         
         # 添加统计信息
-        avg_tps = np.mean(tps_values)
-        plt.axhline(y=avg_tps, color='r', linestyle='--', alpha=0.7, 
+        avg_tps = self.stats['tps']['mean']
+        ax.axhline(y=avg_tps, color='r', linestyle='--', alpha=0.7, 
                    label=f'平均值: {avg_tps:.2f} tokens/s')
-        plt.legend()
+        ax.legend()
         
-        plt.savefig('throughput_trend.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        self._save(fig, 'throughput_trend.png')
         print("📊 吞吐量图表已保存: throughput_trend.png")
     
     def create_resource_usage_chart(self) -> None:
         """创建资源使用图表"""
-        metrics = self.data.get('detailed_metrics', [])
-        if not metrics:
+        if not self._get_plot_data()['count']:
             print("❌ 没有详细指标数据")
             return
         
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in metrics]
-        memory_usage = [m['memory_usage'] for m in metrics]
-        cpu_usage = [m['cpu_usage'] for m in metrics]
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+        fig = self._get_figure((12, 10))
+        ax1, ax2 = fig.subplots(2, 1)
         
         # 内存使用图
-        ax1.plot(timestamps, memory_usage, 'purple', marker='o', markersize=3, linewidth=2)
+        self._draw_series(ax1, 'memory', 'purple', marker='o', markersize=3, linewidth=2)
         ax1.set_title('内存使用趋势', fontsize=14, fontweight='bold')
         ax1.set_ylabel('内存使用 (MB)', fontsize=12)
         ax1.grid(True, alpha=0.3)
         ax1.tick_params(axis='x', rotation=45)
         
         # CPU使用图
-        ax2.plot(timestamps, cpu_usage, 'orange', marker='^', markersize=3, linewidth=2)
+        self._draw_series(ax2, 'cpu', 'orange', marker='^', markersize=3, linewidth=2)
         ax2.set_title('CPU使用率趋势', fontsize=14, fontweight='bold')
         ax2.set_xlabel('时间', fontsize=12)
         ax2.set_ylabel('CPU使用率 (%)', fontsize=12)
         ax2.grid(True, alpha=0.3)
         ax2.tick_params(axis='x', rotation=45)
         
-        plt.tight_layout()
-        plt.savefig('resource_usage.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        fig.tight_layout()
+        self._save(fig, 'resource_usage.png')
         print("📊 资源使用图表已保存: resource_usage.png")
     
     def create_performance_distribution(self) -> None:
         """创建性能分布图"""
-        metrics = self.data.get('detailed_metrics', [])
-        if not metrics:
+        if not self._get_plot_data()['count']:
             print("❌ 没有详细指标数据")
             return
         
-        response_times = [m['response_time'] for m in metrics]
-        tps_values = [m['tokens_per_second'] for m in metrics]
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        fig = self._get_figure((15, 6))
+        ax1, ax2 = fig.subplots(1, 2)
         
         # 响应时间分布
-        ax1.hist(response_times, bins=20, alpha=0.7, color='skyblue', edgecolor='black')
+        self._draw_histogram(ax1, 'response_times', 'skyblue')
         ax1.set_title('响应时间分布', fontsize=14, fontweight='bold')
         ax1.set_xlabel('响应时间 (秒)', fontsize=12)
         ax1.set_ylabel('频次', fontsize=12)
         ax1.grid(True, alpha=0.3)
         
         # 吞吐量分布
-        ax2.hist(tps_values, bins=20, alpha=0.7, color='lightgreen', edgecolor='black')
+        self._draw_histogram(ax2, 'tps', 'lightgreen')
         ax2.set_title('吞吐量分布', fontsize=14, fontweight='bold')
         ax2.set_xlabel('Tokens/秒', fontsize=12)
         ax2.set_ylabel('频次', fontsize=12)
         ax2.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        plt.savefig('performance_distribution.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        fig.tight_layout()
+        self._save(fig, 'performance_distribution.png')
         print("📊 性能分布图表已保存: performance_distribution.png")
     
     def create_summary_dashboard(self) -> None:
         """创建综合仪表板"""
-        metrics = self.data.get('detailed_metrics', [])
         summary = self.data.get('test_summary', {})
         
-        if not metrics:
+        if not self._get_plot_data()['count']:
             print("❌ 没有详细指标数据")
             return
         
-        fig = plt.figure(figsize=(16, 12))
+        fig = self._get_figure((12, 9))
         
         # 创建网格布局
-        gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
-        
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in metrics]
-        response_times = [m['response_time'] for m in metrics]
-        tps_values = [m['tokens_per_second'] for m in metrics]
-        memory_usage = [m['memory_usage'] for m in metrics]
-        cpu_usage = [m['cpu_usage'] for m in metrics]
+        gs = fig.add_gridspec(3, 3, hspace=0.6, wspace=0.35)
         
         # 1. 响应时间趋势
         ax1 = fig.add_subplot(gs[0, :2])
-        ax1.plot(timestamps, response_times, 'b-', marker='o', markersize=3)
+        self._draw_series_collection(ax1, 'response_times', 'b')
         ax1.set_title('响应时间趋势', fontweight='bold')
         ax1.set_ylabel('响应时间 (秒)')
         ax1.grid(True, alpha=0.3)
@@ -199,21 +680,22 @@ class PerformanceVisualizer:
         # 2. 关键指标摘要
         ax2 = fig.add_subplot(gs[0, 2])
         ax2.axis('off')
+        rt_stats = self.stats['response_times']
         summary_text = f"""
 关键指标摘要
 
-总请求数: {len(metrics)}
-平均响应时间: {np.mean(response_times):.3f}s
-平均吞吐量: {np.mean(tps_values):.2f} t/s
-最大响应时间: {max(response_times):.3f}s
-最小响应时间: {min(response_times):.3f}s
+总请求数: {self._get_plot_data()['count']}
+平均响应时间: {rt_stats['mean']:.3f}s
+平均吞吐量: {self.stats['tps']['mean']:.2f} t/s
+最大响应时间: {rt_stats['max']:.3f}s
+最小响应时间: {rt_stats['min']:.3f}s
         """
         ax2.text(0.1, 0.9, summary_text, transform=ax2.transAxes, fontsize=10,
                 verticalalignment='top', bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.5))
         
         # 3. 吞吐量趋势
         ax3 = fig.add_subplot(gs[1, :2])
-        ax3.plot(timestamps, tps_values, 'g-', marker='s', markersize=3)
+        self._draw_series_collection(ax3, 'tps', 'g')
         ax3.set_title('吞吐量趋势', fontweight='bold')
         ax3.set_ylabel('Tokens/秒')
         ax3.grid(True, alpha=0.3)
@@ -221,14 +703,14 @@ class PerformanceVisualizer:
         
         # 4. 响应时间分布
         ax4 = fig.add_subplot(gs[1, 2])
-        ax4.hist(response_times, bins=15, alpha=0.7, color='skyblue', edgecolor='black')
+        self._draw_histogram(ax4, 'response_times', 'skyblue')
         ax4.set_title('响应时间分布', fontweight='bold')
         ax4.set_xlabel('响应时间 (秒)')
         ax4.set_ylabel('频次')
         
         # 5. 内存使用
         ax5 = fig.add_subplot(gs[2, 0])
-        ax5.plot(timestamps, memory_usage, 'purple', marker='o', markersize=2)
+        self._draw_series_collection(ax5, 'memory', 'purple')
         ax5.set_title('内存使用', fontweight='bold')
         ax5.set_ylabel('内存 (MB)')
         ax5.tick_params(axis='x', rotation=45)
@@ -236,7 +718,7 @@ class PerformanceVisualizer:
         
         # 6. CPU使用
         ax6 = fig.add_subplot(gs[2, 1])
-        ax6.plot(timestamps, cpu_usage, 'orange', marker='^', markersize=2)
+        self._draw_series_collection(ax6, 'cpu', 'orange')
         ax6.set_title('CPU使用率', fontweight='bold')
         ax6.set_ylabel('CPU (%)')
         ax6.tick_params(axis='x', rotation=45)
@@ -244,26 +726,34 @@ class PerformanceVisualizer:
         
         # 7. 吞吐量分布
         ax7 = fig.add_subplot(gs[2, 2])
-        ax7.hist(tps_values, bins=15, alpha=0.7, color='lightgreen', edgecolor='black')
+        self._draw_histogram(ax7, 'tps', 'lightgreen')
         ax7.set_title('吞吐量分布', fontweight='bold')
         ax7.set_xlabel('Tokens/秒')
         ax7.set_ylabel('频次')
         
-        plt.suptitle('LM Studio 性能测试综合仪表板', fontsize=16, fontweight='bold')
-        plt.savefig('performance_dashboard.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        fig.suptitle('LM Studio 性能测试综合仪表板', fontsize=16, fontweight='bold')
+        self._save(fig, 'performance_dashboard.png')
         print("📊 综合仪表板已保存: performance_dashboard.png")
     
     def generate_all_charts(self) -> None:
-        """生成所有图表"""
+        """
+        生成所有图表
+        
+        有多个CPU核心时，各图表在独立进程中并行生成，子进程只接收准备好的绘图数据；
+        需要弹出窗口显示或只有单核时按顺序生成。
+        """
         print("🎨 开始生成性能可视化图表...")
         
         try:
-            self.create_response_time_chart()
-            self.create_throughput_chart()
-            self.create_resource_usage_chart()
-            self.create_performance_distribution()
-            self.create_summary_dashboard()
+            workers = min(len(CHARTS), os.cpu_count() or 1)
+            plot_data = self._get_plot_data()
+            if self.show or workers < 2 or not plot_data['count']:
+                for method in CHARTS.values():
+                    getattr(self, method)()
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_render_chart, [plot_data] * len(CHARTS),
+                                      CHARTS, [self.dpi] * len(CHARTS)))
             
             print("\n✅ 所有图表生成完成!")
             print("📁 生成的文件:")
@@ -277,6 +767,19 @@ class PerformanceVisualizer:
             print(f"❌ 生成图表时发生错误: {e}")
 
 
+def _render_chart(plot_data: Dict[str, Any], chart: str, dpi: int) -> None:
+    """
+    在子进程中生成单个图表
+    
+    Args:
+        plot_data: 主进程准备好的绘图数据
+        chart: 图表类型（CHARTS的键）
+        dpi: 保存图片的分辨率
+    """
+    visualizer = PerformanceVisualizer.from_plot_data(plot_data, dpi)
+    getattr(visualizer, CHARTS[chart])()
+
+
 def find_latest_result_file() -> str:
     """
     查找最新的测试结果文件
@@ -284,26 +787,42 @@ def find_latest_result_file() -> str:
     Returns:
         str: 最新结果文件路径
     """
-    result_files = [f for f in os.listdir('.') if f.startswith('lm_studio_performance_') and f.endswith('.json')]
+    # scandir一次遍历目录，修改时间直接取自目录项
+    with os.scandir('.') as entries:
+        result_files = [(e.name, e.stat().st_mtime) for e in entries
+                        if e.name.startswith('lm_studio_performance_')
+                        and e.name.endswith(('.json', '.ndjson'))]
     
     if not result_files:
         raise FileNotFoundError("当前目录下没有找到测试结果文件")
     
-    # 按修改时间排序，返回最新的
-    result_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-    return result_files[0]
+    # 返回修改时间最新的文件
+    return max(result_files, key=itemgetter(1))[0]
 
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="LM Studio性能测试结果可视化工具")
-    parser.add_argument("--file", "-f", help="指定测试结果JSON文件路径")
+    parser.add_argument("--file", "-f", help="指定测试结果文件路径（.json或.ndjson）")
     parser.add_argument("--chart", "-c", 
-                       choices=["response", "throughput", "resource", "distribution", "dashboard", "all"],
+                       choices=[*CHARTS, "all"],
                        default="all", help="指定要生成的图表类型")
+    parser.add_argument("--show", action="store_true", help="保存图表后弹出窗口显示")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析结果的磁盘缓存")
+    parser.add_argument("--dpi", type=int, default=120, help="保存图片的分辨率（默认: 120，出版质量可用300）")
     
     args = parser.parse_args()
     
+    if args.show:
+        # 需要弹出窗口时才切换回环境默认的后端（此时尚未创建任何图表）
+        try:
+            matplotlib.use(_DEFAULT_BACKEND, force=True)
+        except ImportError as e:
+            print(f"⚠️  无法启用图形界面后端，图表将只保存为文件: {e}")
+        else:
+            if plt.get_backend().lower() == 'agg':
+                print("⚠️  当前环境没有可用的图形界面后端，图表将只保存为文件")
+    
     # 确定数据文件
     if args.file:
         data_file = args.file
@@ -318,21 +837,14 @@ def main():
     
     # 创建可视化器
     try:
-        visualizer = PerformanceVisualizer(data_file)
+        visualizer = PerformanceVisualizer(data_file, show=args.show, dpi=args.dpi,
+                                           use_cache=not args.no_cache)
         
         # 根据参数生成相应图表
-        if args.chart == "response":
-            visualizer.create_response_time_chart()
-        elif args.chart == "throughput":
-            visualizer.create_throughput_chart()
-        elif args.chart == "resource":
-            visualizer.create_resource_usage_chart()
-        elif args.chart == "distribution":
-            visualizer.create_performance_distribution()
-        elif args.chart == "dashboard":
-            visualizer.create_summary_dashboard()
-        elif args.chart == "all":
+        if args.chart == "all":
             visualizer.generate_all_charts()
+        else:
+            getattr(visualizer, CHARTS[args.chart])()
             
     except Exception as e:
         print(f"❌ 可视化过程中发生错误: {e}")